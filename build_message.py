@@ -13,12 +13,12 @@ Discord Webhook に投げる payload(dict) を生成するモジュール。
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 
 
 # ---------- データ構造定義 ----------
 
-@dataclass
+@dataclass(slots=True)
 class Article:
     """根拠となるニュース記事1本分の情報"""
     title: str
@@ -26,7 +26,7 @@ class Article:
     source: Optional[str] = None  # "Reuters", "Bloomberg" など任意
 
 
-@dataclass
+@dataclass(slots=True)
 class SimilarCase:
     """過去の類似イベントの情報（あれば）"""
     date: str  # "2022-08-01" など文字列でOK
@@ -34,7 +34,7 @@ class SimilarCase:
     market_reaction: str  # "TSMC -5.2%, SOXX -3.8%" など
 
 
-@dataclass
+@dataclass(slots=True)
 class SpikeEvent:
     """
     Discord に通知したい「リスクスパイク」1件分の情報。
@@ -57,54 +57,70 @@ class SpikeEvent:
 
 # ---------- 内部ヘルパー ----------
 
+# アラートレベル → (絵文字, Discord 埋め込みカラー)
+_LEVEL_TABLE: Dict[str, Tuple[str, int]] = {
+    "critical": ("🛑", 0xE74C3C),  # 赤
+    "alert": ("🔥", 0xE67E22),     # オレンジ
+    "warning": ("⚠️", 0xF1C40F),   # 黄
+    "info": ("ℹ️", 0x3498DB),      # 青
+}
+
+
 def _level_to_emoji_and_color(level: str) -> (str, int):
     """
     アラートレベルから絵文字とDiscord埋め込みカラーを決定。
     color は 10 進数の整数（0xRRGGBB）。
+    未知のレベルは info 扱い。
     """
-    level = level.lower()
-    if level == "critical":
-        return "🛑", 0xE74C3C  # 赤
-    if level == "alert":
-        return "🔥", 0xE67E22  # オレンジ
-    if level == "warning":
-        return "⚠️", 0xF1C40F  # 黄
-    # デフォルト（info）
-    return "ℹ️", 0x3498DB      # 青
+    return _LEVEL_TABLE.get(level.lower(), _LEVEL_TABLE["info"])
+
+
+# データが無いときの表示
+_NO_THEMES = "（テーマ情報なし）"
+_NO_ASSETS = "（影響が想定されるアセットは未推定）"
+_NO_SIMILAR_CASES = "類似ケースの記録はまだありません。"
+_NO_ARTICLES = "（根拠記事の取得に失敗 or まだ実装されていません）"
+
+
+def _format_bullets(items: List[str]) -> str:
+    """["A", "B"] → "- A\n- B"（要素ごとに f-string を作らず join 1 回で済ませる）"""
+    # 以前の f"- {t}" と同じく、str 以外の要素（数値のテーマなど）も str() して並べる
+    return "- " + "\n- ".join(map(str, items))
 
 
 def _format_main_themes(themes: List[str]) -> str:
     if not themes:
-        return "（テーマ情報なし）"
-    return "\n".join(f"- {t}" for t in themes)
+        return _NO_THEMES
+    return _format_bullets(themes)
 
 
 def _format_assets(assets: List[str]) -> str:
     if not assets:
-        return "（影響が想定されるアセットは未推定）"
-    return "\n".join(f"- {a}" for a in assets)
+        return _NO_ASSETS
+    return _format_bullets(assets)
 
 
 def _format_similar_cases(cases: List[SimilarCase]) -> str:
     if not cases:
-        return "類似ケースの記録はまだありません。"
-    lines = []
-    for c in cases:
-        lines.append(f"{c.date} {c.description} → {c.market_reaction}")
-    return "\n".join(lines)
+        return _NO_SIMILAR_CASES
+    return "\n".join(
+        [f"{c.date} {c.description} → {c.market_reaction}" for c in cases]
+    )
 
 
 def _format_articles(articles: List[Article], confidence: Optional[str]) -> str:
     if not articles:
-        return "（根拠記事の取得に失敗 or まだ実装されていません）"
+        return _NO_ARTICLES
 
-    lines = []
-    for i, a in enumerate(articles, start=1):
-        src = f"{a.source}：" if a.source else ""
-        # Discord では [text](url) 形式でリンク可能
-        lines.append(f"{i}. {src}[{a.title}]({a.url})")
     conf = f"信頼度: {confidence}" if confidence else "信頼度: （未設定）"
-    return conf + "\n" + "\n".join(lines)
+    # Discord では [text](url) 形式でリンク可能
+    body = "\n".join(
+        [
+            f"{i}. {a.source + '：' if a.source else ''}[{a.title}]({a.url})"
+            for i, a in enumerate(articles, start=1)
+        ]
+    )
+    return conf + "\n" + body
 
 
 # ---------- 公開関数：Discord Webhook Payload 生成 ----------
@@ -167,6 +183,59 @@ def build_discord_payload(event: SpikeEvent) -> Dict[str, Any]:
     return payload
 
 
+def build_discord_payloads(events: List[SpikeEvent]) -> List[Dict[str, Any]]:
+    """
+    複数の SpikeEvent からまとめて payload を生成する（日次ダイジェストなど用）。
+    """
+    return [build_discord_payload(ev) for ev in events]
+
+
+# Discord の 1 メッセージあたりの上限（embed 数 / 全 embed の合計文字数）
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+def _embed_text_length(embed: Dict[str, Any]) -> int:
+    """Discord が合計文字数の上限として数える部分（title / description / fields）の長さ"""
+    n = len(embed.get("title") or "") + len(embed.get("description") or "")
+    for f in embed.get("fields", ()):
+        n += len(f["name"]) + len(f["value"])
+    return n
+
+
+def build_combined_payloads(
+    events: Iterable[SpikeEvent],
+) -> List[Tuple[List[SpikeEvent], Dict[str, Any]]]:
+    """
+    複数の SpikeEvent を embeds にまとめ、1 メッセージ = 1 POST で送れる payload に分ける。
+    1 メッセージには最大 10 embed・合計 6000 文字までしか入らないので、
+    どちらかを超える手前で次の payload に切り替える。
+
+    戻り値は (その payload に入れた SpikeEvent のリスト, payload) のリスト。
+    """
+    chunks: List[Tuple[List[SpikeEvent], Dict[str, Any]]] = []
+    chunk_events: List[SpikeEvent] = []
+    embeds: List[Dict[str, Any]] = []
+    total_chars = 0
+
+    for ev in events:
+        embed = build_discord_payload(ev)["embeds"][0]
+        n_chars = _embed_text_length(embed)
+        if embeds and (
+            len(embeds) >= MAX_EMBEDS_PER_MESSAGE
+            or total_chars + n_chars > MAX_EMBED_CHARS_PER_MESSAGE
+        ):
+            chunks.append((chunk_events, {"content": None, "embeds": embeds}))
+            chunk_events, embeds, total_chars = [], [], 0
+        chunk_events.append(ev)
+        embeds.append(embed)
+        total_chars += n_chars
+
+    if embeds:
+        chunks.append((chunk_events, {"content": None, "embeds": embeds}))
+    return chunks
+
+
 # ---------- お試し用の簡単サンプル ----------
 
 if __name__ == "__main__":
@@ -2,17 +2,29 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import json
-from dataclasses import dataclass, asdict
+import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Literal
+from typing import TYPE_CHECKING, List, Literal
 
-import pandas as pd
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では標準 json で出力する
+    orjson = None
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# pyarrow が入っていれば CSV 読み込みに Arrow の C++ パーサを使う
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
 
 Severity = Literal["LOW", "MEDIUM", "HIGH", "EXTREME"]
 
 
-@dataclass
+@dataclass(slots=True)
 class SpikeEvent:
     """
     GDELT 集計結果から作る「リスクスパイク」１件分の構造。
@@ -30,6 +42,21 @@ class SpikeEvent:
         """ユニークID（ログやキャッシュ用）"""
         return f"{self.date}:{self.country_code}:{self.risk_type}"
 
+    def to_dict(self) -> dict:
+        """
+        JSON 出力用の dict。
+        フィールドは全部スカラーなので dataclasses.asdict の再帰コピーは不要。
+        """
+        return {
+            "date": self.date,
+            "country_code": self.country_code,
+            "risk_type": self.risk_type,
+            "today_count": self.today_count,
+            "baseline_mean": self.baseline_mean,
+            "delta_percent": self.delta_percent,
+            "severity": self.severity,
+        }
+
 
 # -----------------------------
 # しきい値・セグメント定義
@@ -39,20 +66,38 @@ DEFAULT_MIN_TODAY = 10          # 今日の件数が少なすぎるものは捨
 DEFAULT_MIN_BASELINE = 1.0      # ベースライン 0〜小さすぎるものはノイズ扱い
 DEFAULT_MIN_DELTA_PERCENT = 100 # +100% 未満は「スパイク」と呼ばない
 
+# (下限値, シビア度) を上から順に判定する
+SEVERITY_THRESHOLDS: tuple[tuple[float, Severity], ...] = (
+    (1000, "EXTREME"),
+    (500, "HIGH"),
+    (200, "MEDIUM"),
+)
+
+
 def classify_severity(delta_percent: float) -> Severity:
     """
     変化率からシビア度を分類。
-    必要になったらここだけ変えれば通知の粒度を調整できる。
+    必要になったら SEVERITY_THRESHOLDS だけ変えれば通知の粒度を調整できる。
     """
-    if delta_percent >= 1000:
-        return "EXTREME"
-    if delta_percent >= 500:
-        return "HIGH"
-    if delta_percent >= 200:
-        return "MEDIUM"
+    for threshold, severity in SEVERITY_THRESHOLDS:
+        if delta_percent >= threshold:
+            return severity
     return "LOW"
 
 
+def classify_severity_array(delta_percent: np.ndarray) -> np.ndarray:
+    """
+    classify_severity の配列版。np.select で列全体を一度に分類する。
+    """
+    import numpy as np
+
+    return np.select(
+        [delta_percent >= threshold for threshold, _ in SEVERITY_THRESHOLDS],
+        [severity for _, severity in SEVERITY_THRESHOLDS],
+        default="LOW",
+    )
+
+
 # -----------------------------
 # CSV → SpikeEvent 変換本体
 # -----------------------------
@@ -67,6 +112,22 @@ REQUIRED_COLUMNS = {
 }
 
 
+# 欠損セルは従来（iterrows + str()）どおり "nan" という文字列にする
+_MISSING_STR = "nan"
+
+
+def _str_values(col: pd.Series) -> List[str]:
+    """
+    文字列列を list[str] にする。
+    欠損の表現は CSV エンジン（c → nan / pyarrow → None）や pandas のバージョンで
+    変わるので、isna() で判定して明示的に _MISSING_STR にそろえる。
+    """
+    return [
+        _MISSING_STR if missing else str(v)
+        for v, missing in zip(col.tolist(), col.isna().tolist())
+    ]
+
+
 def load_spike_events_from_csv(
     csv_path: str | Path,
     min_today: int = DEFAULT_MIN_TODAY,
@@ -77,37 +138,64 @@ def load_spike_events_from_csv(
     集計済み CSV（as_of / country_code / risk_type / today / baseline / delta_percent）
     を読み込み、SpikeEvent のリストに変換する。
     """
+    # numpy / pandas は重いので、SpikeEvent だけ使う呼び出し元のために遅延 import
+    import numpy as np
+    import pandas as pd
+
     csv_path = Path(csv_path)
-    df = pd.read_csv(csv_path)
 
-    missing = REQUIRED_COLUMNS - set(df.columns)
+    # ヘッダだけ先に読んで列をチェックし、本体は必要な列だけ型指定で読む
+    header = pd.read_csv(csv_path, nrows=0)
+    missing = REQUIRED_COLUMNS - set(header.columns)
     if missing:
         raise ValueError(f"CSV に必要な列がありません: {missing}")
 
+    df = pd.read_csv(
+        csv_path,
+        usecols=list(REQUIRED_COLUMNS),
+        # 文字列列は dtype=str にしない（pyarrow エンジンだと欠損が "None" という文字列になり、
+        # 本物の値と区別できなくなる）。欠損のまま読み、_str_values で "nan" にそろえる。
+        dtype={
+            "baseline": np.float64,
+            "delta_percent": np.float64,
+        },
+        engine=CSV_ENGINE,
+    )
+
     # しきい値フィルタ
     mask = (
         (df["today"] >= min_today)
         & (df["baseline"] >= min_baseline)
         & (df["delta_percent"] >= min_delta_percent)
     )
-    df = df.loc[mask].copy()
+    df = df.loc[mask]
 
     # 変化率の大きい順にソート（上から通知する想定）
     df = df.sort_values("delta_percent", ascending=False)
 
-    events: List[SpikeEvent] = []
-    for _, row in df.iterrows():
-        sev = classify_severity(float(row["delta_percent"]))
-        ev = SpikeEvent(
-            date=str(row["as_of"]),               # 既に "YYYY-MM-DD" 想定
-            country_code=str(row["country_code"]),
-            risk_type=str(row["risk_type"]),
-            today_count=int(row["today"]),
-            baseline_mean=float(row["baseline"]),
-            delta_percent=float(row["delta_percent"]),
-            severity=sev,
+    delta_percent = df["delta_percent"].to_numpy(np.float64)
+    severities = classify_severity_array(delta_percent)
+
+    events: List[SpikeEvent] = [
+        SpikeEvent(
+            date=date,                     # 既に "YYYY-MM-DD" 想定
+            country_code=country_code,
+            risk_type=risk_type,
+            today_count=today_count,
+            baseline_mean=baseline_mean,
+            delta_percent=delta,
+            severity=severity,
         )
-        events.append(ev)
+        for date, country_code, risk_type, today_count, baseline_mean, delta, severity in zip(
+            _str_values(df["as_of"]),
+            _str_values(df["country_code"]),
+            _str_values(df["risk_type"]),
+            df["today"].to_numpy(np.int64).tolist(),
+            df["baseline"].to_numpy(np.float64).tolist(),
+            delta_percent.tolist(),
+            severities.tolist(),
+        )
+    ]
 
     return events
 
@@ -157,13 +245,20 @@ def main() -> None:
         min_delta_percent=args.min_delta_percent,
     )
 
-    for ev in events:
-        obj = asdict(ev)
-        if args.pretty:
-            print(json.dumps(obj, ensure_ascii=False, indent=2))
-        else:
-            # JSON Lines 形式（1行1イベント）で吐く
-            print(json.dumps(obj, ensure_ascii=False))
+    if args.pretty:
+        for ev in events:
+            print(json.dumps(ev.to_dict(), ensure_ascii=False, indent=2))
+        return
+
+    # JSON Lines 形式（1行1イベント）で吐く。行ごとに print せず writelines でまとめて書く
+    if orjson is not None:
+        # orjson は dataclass をそのまま改行付きのバイト列にできる
+        sys.stdout.buffer.writelines(
+            orjson.dumps(ev, option=orjson.OPT_APPEND_NEWLINE) for ev in events
+        )
+    else:
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        sys.stdout.writelines(encode(ev.to_dict()) + "\n" for ev in events)
 
 
 if __name__ == "__main__":
@@ -12,9 +12,7 @@ build_message.SpikeEvent に変換するためのユーティリティ。
 
 from __future__ import annotations
 
-from typing import Dict, List, Any, Optional, Tuple
-
-import pandas as pd
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Sequence, Tuple
 
 from build_message import (
     SpikeEvent,
@@ -22,6 +20,9 @@ from build_message import (
     Article,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 # ========== 1. アセット推定ルールの例 ==========
 
@@ -122,6 +123,38 @@ def infer_confidence(
 
 # ========== 3. アセット・類似ケース・記事の紐づけ ==========
 
+def _merge_asset_rules(
+    asset_rules_exact: Dict[Tuple[str, str], List[str]],
+    asset_rules_by_risk: Dict[str, List[str]],
+) -> Dict[Tuple[Optional[str], str], List[str]]:
+    """
+    国×リスクのルールと、リスクのみのルールを 1 つの dict にまとめる。
+    リスクのみのルールは (None, risk_type) をキーにして入れておく。
+    """
+    merged: Dict[Tuple[Optional[str], str], List[str]] = {
+        (None, risk_type): assets for risk_type, assets in asset_rules_by_risk.items()
+    }
+    merged.update(asset_rules_exact)
+    return merged
+
+
+# デフォルトルールは import 時に 1 回だけまとめておく
+_DEFAULT_ASSET_RULES_MERGED = _merge_asset_rules(
+    DEFAULT_ASSET_RULES, DEFAULT_ASSET_RULES_BY_RISK
+)
+
+
+def _lookup_merged_assets(
+    merged: Dict[Tuple[Optional[str], str], List[str]],
+    country_name: str,
+    risk_type: str,
+) -> List[str]:
+    assets = merged.get((country_name, risk_type))
+    if assets is None:
+        assets = merged.get((None, risk_type), [])
+    return assets
+
+
 def guess_assets(
     country_name: str,
     risk_type: str,
@@ -132,6 +165,11 @@ def guess_assets(
     国名とリスク種別から、影響が出そうなアセットを推定する。
     ルールが見つからなければ空リストを返す。
     """
+    if not asset_rules_exact and not asset_rules_by_risk:
+        return _lookup_merged_assets(
+            _DEFAULT_ASSET_RULES_MERGED, country_name, risk_type
+        )
+
     asset_rules_exact = asset_rules_exact or DEFAULT_ASSET_RULES
     asset_rules_by_risk = asset_rules_by_risk or DEFAULT_ASSET_RULES_BY_RISK
 
@@ -145,6 +183,28 @@ def guess_assets(
     return []
 
 
+def guess_assets_many(
+    country_names: Sequence[str],
+    risk_types: Sequence[str],
+    asset_rules_exact: Optional[Dict[Tuple[str, str], List[str]]] = None,
+    asset_rules_by_risk: Optional[Dict[str, List[str]]] = None,
+) -> List[List[str]]:
+    """
+    guess_assets の複数行版。ルールのマージは呼び出しごとに 1 回だけ行う。
+    """
+    if not asset_rules_exact and not asset_rules_by_risk:
+        merged = _DEFAULT_ASSET_RULES_MERGED
+    else:
+        merged = _merge_asset_rules(
+            asset_rules_exact or DEFAULT_ASSET_RULES,
+            asset_rules_by_risk or DEFAULT_ASSET_RULES_BY_RISK,
+        )
+    return [
+        _lookup_merged_assets(merged, country_name, risk_type)
+        for country_name, risk_type in zip(country_names, risk_types)
+    ]
+
+
 def lookup_similar_cases(
     country_name: str,
     risk_type: str,
@@ -202,17 +262,63 @@ def df_to_spike_events(
 
     それ以外の情報（類似ケース・記事）はオプション引数で外付けする。
     """
-    events: List[SpikeEvent] = []
-
-    for _, row in df_spikes.iterrows():
-        country_name = str(row["country_name"])
-        risk_type = str(row["risk_type"])
-        delta_percent = float(row["delta_percent"])
-        abs_count = int(row["abs_count"])
-        baseline = float(row["baseline"])
+    # numpy / pandas は重いので、ルール系ヘルパだけ使う呼び出し元のために遅延 import
+    import numpy as np
 
+    events: List[SpikeEvent] = []
+    n_rows = len(df_spikes)
+    columns = df_spikes.columns
+
+    # 行ごとの Series 生成を避けるため、列を先に Python のリストへ取り出しておく
+    # （astype(str) は pandas 3 で欠損を float の nan のまま残すので、値ごとに str() する）
+    country_names = [str(v) for v in df_spikes["country_name"].tolist()]
+    risk_types = [str(v) for v in df_spikes["risk_type"].tolist()]
+    delta_percents = df_spikes["delta_percent"].to_numpy(np.float64).tolist()
+    abs_counts = df_spikes["abs_count"].to_numpy(np.int64).tolist()
+    baselines = df_spikes["baseline"].to_numpy(np.float64).tolist()
+    if "main_themes" in columns:
+        main_themes_col = df_spikes["main_themes"].tolist()
+    else:
+        main_themes_col = [None] * n_rows
+    # アセット推定は全行まとめて行う
+    assets_col = guess_assets_many(
+        country_names,
+        risk_types,
+        asset_rules_exact=asset_rules_exact,
+        asset_rules_by_risk=asset_rules_by_risk,
+    )
+
+    # source_count の欠損判定はループの外で np.isnan 1 回にまとめる
+    if "source_count" in columns:
+        source_count_arr = df_spikes["source_count"].to_numpy(np.float64)
+        source_counts = source_count_arr.tolist()
+        source_count_valid = (~np.isnan(source_count_arr)).tolist()
+    else:
+        source_counts = [None] * n_rows
+        source_count_valid = [False] * n_rows
+
+    for (
+        country_name,
+        risk_type,
+        delta_percent,
+        abs_count,
+        baseline,
+        main_themes_raw,
+        source_count_raw,
+        has_source_count,
+        assets,
+    ) in zip(
+        country_names,
+        risk_types,
+        delta_percents,
+        abs_counts,
+        baselines,
+        main_themes_col,
+        source_counts,
+        source_count_valid,
+        assets_col,
+    ):
         # main_themes が文字列だったら簡易パース
-        main_themes_raw = row.get("main_themes", [])
         if isinstance(main_themes_raw, str):
             # ";" 区切り / "," 区切りなどを想定
             parts = [p.strip() for p in main_themes_raw.replace(",", ";").split(";")]
@@ -222,9 +328,7 @@ def df_to_spike_events(
         else:
             main_themes = []
 
-        source_count = None
-        if "source_count" in row and not pd.isna(row["source_count"]):
-            source_count = int(row["source_count"])
+        source_count = int(source_count_raw) if has_source_count else None
 
         # レベル & 信頼度
         level = infer_level(delta_percent)
@@ -235,14 +339,6 @@ def df_to_spike_events(
             source_count=source_count,
         )
 
-        # アセット推定
-        assets = guess_assets(
-            country_name=country_name,
-            risk_type=risk_type,
-            asset_rules_exact=asset_rules_exact,
-            asset_rules_by_risk=asset_rules_by_risk,
-        )
-
         # 類似ケース
         similar_cases = lookup_similar_cases(
             country_name=country_name,
@@ -301,7 +397,9 @@ if __name__ == "__main__":
             "source_count": 8,
         },
     ]
-    df = pd.DataFrame(data)
+    import pandas
+
+    df = pandas.DataFrame(data)
 
     events = df_to_spike_events(df)
     for ev in events:
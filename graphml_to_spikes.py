@@ -18,9 +18,12 @@ GraphML (GDELT KG) から
 """
 
 import argparse
+import os
+import re
+import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 
-import networkx as nx
+import numpy as np
 import pandas as pd
 
 # ==== ノード種別 & 属性名 ====
@@ -49,6 +52,94 @@ def log(msg: str) -> None:
 
 # ==== CAMEO / Theme からリスク種別をざっくり分類する ====
 
+# 参考: CAMEO root
+#  14 PROTEST
+#  15 EXHIBIT FORCE POSTURE
+#  16 REDUCE RELATIONS
+#  17 COERCE
+#  18 ASSAULT
+#  19 FIGHT
+#  20 MASS VIOLENCE
+CAMEO_ROOT_RISK: dict[int, str] = {
+    18: RISK_MILITARY,
+    19: RISK_MILITARY,
+    20: RISK_MILITARY,
+    15: RISK_MILITARY,
+    17: RISK_MILITARY,
+    14: RISK_CIVIL_UNREST,
+    10: RISK_POLITICAL,
+    11: RISK_POLITICAL,
+    12: RISK_POLITICAL,
+    13: RISK_POLITICAL,
+    16: RISK_POLITICAL,
+    6: RISK_ECONOMIC,  # material cooperation / aid など
+    7: RISK_ECONOMIC,
+}
+
+# Theme ラベルのキーワード。上から順に判定し、最初に当たったものを採用する。
+THEME_KEYWORD_RULES: list[tuple[str, tuple[str, ...]]] = [
+    # 自然災害
+    (
+        RISK_NATURAL_DISASTER,
+        (
+            "NATURAL_DISASTER",
+            "EARTHQUAKE",
+            "FLOOD",
+            "TYPHOON",
+            "HURRICANE",
+            "TSUNAMI",
+            "WILDFIRE",
+            "LANDSLIDE",
+        ),
+    ),
+    # 軍事 / 武力衝突
+    (
+        RISK_MILITARY,
+        (
+            "MILITARY",
+            "ARMEDCONFLICT",
+            "WAR",
+            "INVASION",
+            "MISSILE",
+            "AIRSTRIKE",
+            "BOMBARD",
+        ),
+    ),
+    # 抗議活動・ストライキ
+    (RISK_CIVIL_UNREST, ("PROTEST", "DEMONSTRATION", "STRIKE", "RIOT", "MOBILIZATION")),
+    # テロ / 政治暴力（テロも広義の武力リスクとして扱う）
+    (RISK_MILITARY, ("TERROR", "TERRORISM", "BOMBING", "INSURGENCY")),
+    # 政治・選挙・政権交代
+    (
+        RISK_POLITICAL,
+        ("ELECTION", "GOVERNMENT", "COUP", "REGIME", "PARLIAMENT", "SANCTION"),
+    ),
+    # 経済・制裁・貿易
+    (RISK_ECONOMIC, ("ECONOMY", "TRADE", "SANCTION", "TARIFF", "EXPORT", "IMPORT")),
+]
+
+# 単発判定用に、ルールごとのキーワードを 1 本の正規表現にまとめておく
+_THEME_RULE_PATTERNS: list[tuple[str, re.Pattern[str]]] = [
+    (risk, re.compile("|".join(re.escape(k) for k in keywords)))
+    for risk, keywords in THEME_KEYWORD_RULES
+]
+
+# 全キーワード → 最初に出てくるルールの番号
+_THEME_KEYWORD_RULE: dict[str, int] = {}
+for _rule_idx, (_, _keywords) in enumerate(THEME_KEYWORD_RULES):
+    for _keyword in _keywords:
+        _THEME_KEYWORD_RULE.setdefault(_keyword, _rule_idx)
+
+# 全キーワードを 1 本の正規表現にまとめ、ラベルを 1 回走査するだけで全ルールを照合する。
+# 先読み (?=...) にして重なったマッチも拾い、同じ位置ではルール順の早いキーワードを優先する。
+_THEME_SCAN_RE = re.compile(
+    "(?=("
+    + "|".join(
+        re.escape(k) for k in sorted(_THEME_KEYWORD_RULE, key=_THEME_KEYWORD_RULE.get)
+    )
+    + "))"
+)
+
 
 def _classify_by_cameo(cameo: str) -> str | None:
     """
@@ -64,92 +155,25 @@ def _classify_by_cameo(cameo: str) -> str | None:
     if not root_str.isdigit():
         return None
 
-    root = int(root_str)
-
-    # 参考: CAMEO root
-    #  14 PROTEST
-    #  15 EXHIBIT FORCE POSTURE
-    #  16 REDUCE RELATIONS
-    #  17 COERCE
-    #  18 ASSAULT
-    #  19 FIGHT
-    #  20 MASS VIOLENCE
-    if root in (18, 19, 20, 15, 17):
-        return RISK_MILITARY
-    if root == 14:
-        return RISK_CIVIL_UNREST
-    if root in (10, 11, 12, 13, 16):
-        return RISK_POLITICAL
-    if root in (6, 7):  # material cooperation / aid など
-        return RISK_ECONOMIC
-
-    # その他はここでは未分類
-    return None
+    # その他は CAMEO_ROOT_RISK に無いので未分類（None）
+    return CAMEO_ROOT_RISK.get(int(root_str))
 
 
 def _classify_by_theme_labels(theme_labels: list[str]) -> str | None:
     """
     Theme ノードのラベルに含まれるキーワードから分類。
     GDELT の Theme は環境ごとに結構ブレるので、
-    必要に応じてキーワードを増やしていく想定。
+    必要に応じて THEME_KEYWORD_RULES のキーワードを増やしていく想定。
     """
     if not theme_labels:
         return None
 
-    # 大文字にしてから判定
-    up = [t.upper() for t in theme_labels]
-
-    def contains_any(substrings: list[str]) -> bool:
-        return any(any(s in t for s in substrings) for t in up)
-
-    # 自然災害
-    if contains_any(
-        [
-            "NATURAL_DISASTER",
-            "EARTHQUAKE",
-            "FLOOD",
-            "TYPHOON",
-            "HURRICANE",
-            "TSUNAMI",
-            "WILDFIRE",
-            "LANDSLIDE",
-        ]
-    ):
-        return RISK_NATURAL_DISASTER
-
-    # 軍事 / 武力衝突
-    if contains_any(
-        [
-            "MILITARY",
-            "ARMEDCONFLICT",
-            "WAR",
-            "INVASION",
-            "MISSILE",
-            "AIRSTRIKE",
-            "BOMBARD",
-        ]
-    ):
-        return RISK_MILITARY
-
-    # 抗議活動・ストライキ
-    if contains_any(
-        ["PROTEST", "DEMONSTRATION", "STRIKE", "RIOT", "MOBILIZATION"]
-    ):
-        return RISK_CIVIL_UNREST
-
-    # テロ / 政治暴力
-    if contains_any(["TERROR", "TERRORISM", "BOMBING", "INSURGENCY"]):
-        return RISK_MILITARY  # テロも広義の武力リスクとして扱う
-
-    # 政治・選挙・政権交代
-    if contains_any(
-        ["ELECTION", "GOVERNMENT", "COUP", "REGIME", "PARLIAMENT", "SANCTION"]
-    ):
-        return RISK_POLITICAL
-
-    # 経済・制裁・貿易
-    if contains_any(["ECONOMY", "TRADE", "SANCTION", "TARIFF", "EXPORT", "IMPORT"]):
-        return RISK_ECONOMIC
+    # 大文字にしてから判定。キーワードに改行は含まれないので、
+    # 改行で連結してもラベルをまたいだ誤マッチは起きない。
+    joined = "\n".join(theme_labels).upper()
+    for risk, pattern in _THEME_RULE_PATTERNS:
+        if pattern.search(joined):
+            return risk
 
     return None
 
@@ -177,87 +201,444 @@ def classify_event_risk(cameo: str | None, theme_labels: list[str]) -> str:
     return RISK_OTHER
 
 
-# ==== GraphML → 日付×国×リスク種別の集計 ====
+def _theme_label_rule(label: str) -> float:
+    """
+    Theme ラベル 1 つが当たる THEME_KEYWORD_RULES の最小番号（当たらなければ NaN）。
+    """
+    rules = [_THEME_KEYWORD_RULE[k] for k in _THEME_SCAN_RE.findall(label.upper())]
+    return min(rules) if rules else np.nan
 
 
-def graphml_to_daily_counts(graphml_path: str) -> pd.DataFrame:
+def theme_label_rules(labels: pd.Series) -> pd.Series:
     """
-    GraphML を読み込み、以下の列を持つ DataFrame を返す:
-      - date: datetime64[ns]
-      - country_code: str
-      - risk_type: str
-      - count: int
+    Theme ラベルの列に _theme_label_rule を当てる。
+    GDELT の Theme は種類が限られるので、ユニークなラベルごとに 1 回だけ走査する。
     """
-    log(f"Loading GraphML: {graphml_path}")
-    G = nx.read_graphml(graphml_path)
-    log(f"Nodes: {G.number_of_nodes()}, Edges: {G.number_of_edges()}")
+    rule_of = {label: _theme_label_rule(label) for label in pd.unique(labels)}
+    return labels.map(rule_of).astype(np.float64)
 
-    rows: list[dict] = []
 
-    for node_id, data in G.nodes(data=True):
-        if data.get(NODE_ATTR_TYPE) != EVENT_NODE_TYPE:
-            continue
+def classify_event_risks(cameos: pd.Series, theme_rules: pd.Series) -> np.ndarray:
+    """
+    classify_event_risk の列版。イベント全体を pandas / numpy でまとめて分類する
+    （判定順は classify_event_risk と同じ）。
 
-        date_str = data.get(NODE_ATTR_DATE)
-        if not date_str:
-            continue
+    - cameos: CAMEO コードの列（欠損は None / NaN）
+    - theme_rules: イベントごとに、近傍 Theme ラベルの theme_label_rules の最小値
+                   （Theme が無い・どのルールにも当たらないイベントは NaN）
+    """
+    # 1. CAMEO ベース（先頭2桁が数字のものだけ root code として使う）
+    root_str = cameos.fillna("").astype(str).str.strip().str.slice(0, 2)
+    root = pd.to_numeric(root_str.where(root_str.str.isdigit()), errors="coerce")
+    risk = root.map(CAMEO_ROOT_RISK).to_numpy(dtype=object)
+
+    # 2. CAMEO で決まらなかったものだけ Theme ルールで補完
+    need_theme = pd.isna(risk)
+    rules = theme_rules.to_numpy(dtype=np.float64)[need_theme]
+    has_rule = ~np.isnan(rules)
+    rule_risks = np.array([r for r, _ in THEME_KEYWORD_RULES], dtype=object)
+    risk[need_theme] = np.where(
+        has_rule,
+        rule_risks[np.where(has_rule, rules, 0).astype(np.intp)],
+        # 3. 何もわからなければ OTHER
+        RISK_OTHER,
+    )
+    return risk
 
-        try:
-            event_date = datetime.strptime(str(date_str), "%Y%m%d").date()
-        except Exception:
-            continue
 
-        cameo = data.get(NODE_ATTR_CAMEO)
-        # 近傍の Location / Theme を収集
-        countries: set[str] = set()
-        theme_labels: list[str] = []
+# ==== GraphML のストリーム読み込み ====
+
 
-        for nbr in G.neighbors(node_id):
-            nbr_data = G.nodes[nbr]
-            ntype = nbr_data.get(NODE_ATTR_TYPE)
+def _local_name(tag: str) -> str:
+    """'{http://graphml.graphdrawing.org/xmlns}node' → 'node'"""
+    return tag.rpartition("}")[2]
 
-            if ntype == LOCATION_NODE_TYPE:
-                cc = nbr_data.get(NODE_ATTR_COUNTRY)
+
+def _parse_graphml_records(source) -> dict:
+    """
+    GraphML を iterparse で 1 パス読みし、集計に必要なノード・エッジだけを
+    列ごとのリストとして取り出す（networkx のグラフは組み立てない）。
+    source はファイルパスでも read() を持つファイルライクでもよい。
+
+    戻り値は dict:
+      - event_ids / event_dates / event_cameos      （Event ノード）
+      - location_ids / location_countries           （Location ノード）
+      - theme_ids / theme_labels                    （Theme ノード）
+      - edge_srcs / edge_dsts                       （エッジ、向きはファイルのまま）
+      - n_nodes: ノード総数, directed: edgedefault が directed か
+    """
+    # <key id> → attr.name（ノード用のみ）。<default> の値はノードに適用しない
+    # （networkx の read_graphml も G.graph["node_default"] に入れるだけでノード属性にはしない）
+    key_names: dict[str, str] = {}
+    graph_elem = None
+    directed = False
+    n_nodes = 0
+
+    # 行ごとの tuple / dict は作らず、列ごとのリストに直接積む（SoA）
+    event_ids: list[str] = []
+    event_dates: list[str | None] = []
+    event_cameos: list[str | None] = []
+    location_ids: list[str] = []
+    location_countries: list[str] = []
+    theme_ids: list[str] = []
+    theme_labels: list[str] = []
+    edge_srcs: list[str] = []
+    edge_dsts: list[str] = []
+
+    for xml_event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = _local_name(elem.tag)
+
+        if xml_event == "start":
+            if tag == "graph" and graph_elem is None:
+                graph_elem = elem
+                directed = elem.get("edgedefault") == "directed"
+            continue
+
+        if tag == "key":
+            if elem.get("for", "all") in ("node", "all"):
+                key_id = elem.get("id")
+                name = elem.get("attr.name", key_id)
+                key_names[key_id] = name
+
+        elif tag == "node":
+            n_nodes += 1
+            attrs: dict[str, str | None] = {}
+            for child in elem:
+                if _local_name(child.tag) == "data":
+                    name = key_names.get(child.get("key"))
+                    if name is not None:
+                        attrs[name] = child.text
+
+            node_id = elem.get("id")
+            ntype = attrs.get(NODE_ATTR_TYPE)
+            if ntype == EVENT_NODE_TYPE:
+                event_ids.append(node_id)
+                event_dates.append(attrs.get(NODE_ATTR_DATE))
+                event_cameos.append(attrs.get(NODE_ATTR_CAMEO))
+            elif ntype == LOCATION_NODE_TYPE:
+                cc = attrs.get(NODE_ATTR_COUNTRY)
                 if cc:
-                    countries.add(str(cc))
+                    location_ids.append(node_id)
+                    location_countries.append(cc)
             elif ntype == THEME_NODE_TYPE:
-                lab = nbr_data.get(NODE_ATTR_LABEL)
+                lab = attrs.get(NODE_ATTR_LABEL)
                 if lab:
-                    theme_labels.append(str(lab))
+                    theme_ids.append(node_id)
+                    theme_labels.append(lab)
+            # 読み終わった要素は捨ててメモリを抑える
+            graph_elem.clear()
+
+        elif tag == "edge":
+            edge_srcs.append(elem.get("source"))
+            edge_dsts.append(elem.get("target"))
+            graph_elem.clear()
+
+    return {
+        "event_ids": event_ids,
+        "event_dates": event_dates,
+        "event_cameos": event_cameos,
+        "location_ids": location_ids,
+        "location_countries": location_countries,
+        "theme_ids": theme_ids,
+        "theme_labels": theme_labels,
+        "edge_srcs": edge_srcs,
+        "edge_dsts": edge_dsts,
+        "n_nodes": n_nodes,
+        "directed": directed,
+    }
+
+
+def _records_to_frames(
+    records: dict,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    _parse_graphml_records の結果を DataFrame にする。
+
+    戻り値 (events, locations, themes, edges):
+      - events:    id, date, cameo   （Event ノード）
+      - locations: id, country       （Location ノード）
+      - themes:    id, label         （Theme ノード）
+      - edges:     src, dst          （無向グラフなら両方向を含む）
+    """
+    log(f"Nodes: {records['n_nodes']}, Edges: {len(records['edge_srcs'])}")
+
+    events = pd.DataFrame(
+        {
+            "id": records["event_ids"],
+            "date": records["event_dates"],
+            "cameo": records["event_cameos"],
+        },
+        dtype=object,
+    )
+    locations = pd.DataFrame(
+        {"id": records["location_ids"], "country": records["location_countries"]},
+        dtype=object,
+    )
+    themes = pd.DataFrame(
+        {"id": records["theme_ids"], "label": records["theme_labels"]}, dtype=object
+    )
+    edges = pd.DataFrame(
+        {"src": records["edge_srcs"], "dst": records["edge_dsts"]}, dtype=object
+    )
+    if not records["directed"]:
+        # 無向グラフでは両端どちらからも近傍として辿れるようにする
+        edges = pd.concat(
+            [edges, edges.rename(columns={"src": "dst", "dst": "src"})],
+            ignore_index=True,
+        )
+    edges = edges.drop_duplicates()
+
+    return events, locations, themes, edges
+
+
+def _parse_graphml_stream(
+    graphml_path: str,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """GraphML を 1 プロセスで読み、(events, locations, themes, edges) を返す。"""
+    return _records_to_frames(_parse_graphml_records(graphml_path))
+
+
+# ==== GraphML の並列読み込み ====
+
+# これより小さいファイルはプロセスを立ち上げるほうが高くつくので 1 プロセスで読む
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
 
-        if not countries:
-            # 位置情報が取れない Event は今回は無視
+_SCAN_BLOCK_BYTES = 1024 * 1024
+# トップレベルの <node> / <edge> の開始タグ（名前空間プレフィックス付きも許す）
+_ELEMENT_START_RE = re.compile(rb"<(?:[\w.-]+:)?(?:node|edge)[\s/>]")
+_GRAPH_END_RE = re.compile(rb"</(?:[\w.-]+:)?graph\s*>")
+
+
+def _find_element_start(f, offset: int, end: int) -> int | None:
+    """offset 以降で最初の <node / <edge の位置を返す（end までに無ければ None）。"""
+    f.seek(offset)
+    pos = offset
+    tail = b""
+    while pos < end:
+        block = f.read(min(_SCAN_BLOCK_BYTES, end - pos))
+        if not block:
+            break
+        buf = tail + block
+        m = _ELEMENT_START_RE.search(buf)
+        if m:
+            return pos - len(tail) + m.start()
+        # タグがブロック境界をまたいでも拾えるよう、末尾を少し持ち越す
+        tail = buf[-32:]
+        pos += len(block)
+    return None
+
+
+def _split_graphml(
+    graphml_path: str, n_chunks: int
+) -> tuple[bytes, bytes, list[tuple[int, int]]]:
+    """
+    GraphML を <node> / <edge> の境界で n_chunks 個のバイト範囲に分ける。
+
+    戻り値 (header, footer, ranges):
+      - header: 先頭 〜 最初の <node>/<edge> の直前（XML 宣言・<key>・<graph> 開始タグを含む）
+      - footer: 最後の </graph> 以降（閉じタグ）
+      - ranges: 本体部分の (開始, 終了) バイト位置のリスト
+    """
+    with open(graphml_path, "rb") as f:
+        size = f.seek(0, 2)
+
+        f.seek(max(0, size - 64 * 1024))
+        tail = f.read()
+        graph_ends = list(_GRAPH_END_RE.finditer(tail))
+        if not graph_ends:
+            raise ValueError("</graph> が見つかりません")
+        body_end = size - len(tail) + graph_ends[-1].start()
+
+        body_start = _find_element_start(f, 0, body_end)
+        if body_start is None:
+            raise ValueError("<node> / <edge> が見つかりません")
+
+        f.seek(0)
+        header = f.read(body_start)
+        f.seek(body_end)
+        footer = f.read()
+
+        bounds = [body_start]
+        step = (body_end - body_start) // n_chunks
+        for i in range(1, n_chunks):
+            start = _find_element_start(f, max(body_start + i * step, bounds[-1] + 1), body_end)
+            if start is None:
+                break
+            if start > bounds[-1]:
+                bounds.append(start)
+        bounds.append(body_end)
+
+    return header, footer, list(zip(bounds[:-1], bounds[1:]))
+
+
+class _GraphmlChunkReader:
+    """header + ファイルの [start, end) + footer を 1 つの XML として read() できるようにする"""
+
+    def __init__(self, graphml_path: str, header: bytes, footer: bytes, start: int, end: int) -> None:
+        self._f = open(graphml_path, "rb")
+        self._f.seek(start)
+        self._remaining = end - start
+        self._prefix = header
+        self._suffix = footer
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefix:
+            data, self._prefix = self._prefix, b""
+            return data
+        if self._remaining > 0:
+            n = self._remaining if size is None or size < 0 else min(size, self._remaining)
+            data = self._f.read(n)
+            self._remaining -= len(data)
+            if data:
+                return data
+            self._remaining = 0
+        data, self._suffix = self._suffix, b""
+        return data
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def _parse_graphml_chunk(args: tuple[str, bytes, bytes, int, int]) -> dict:
+    """ワーカープロセス側: 1 チャンク分をパースしてレコードを返す"""
+    graphml_path, header, footer, start, end = args
+    reader = _GraphmlChunkReader(graphml_path, header, footer, start, end)
+    try:
+        return _parse_graphml_records(reader)
+    finally:
+        reader.close()
+
+
+def _parse_graphml_parallel(
+    graphml_path: str, workers: int
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    GraphML を <node>/<edge> 境界でバイト範囲に分け、ProcessPoolExecutor で並列にパースする。
+    集計には Event と Location/Theme の対応（他チャンクにあるかもしれない）が要るので、
+    ワーカーは件数ではなくレコードを返し、親でまとめてから 1 回だけ集計する。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    header, footer, ranges = _split_graphml(graphml_path, workers)
+    log(f"Parsing GraphML in {len(ranges)} chunks")
+
+    tasks = [(graphml_path, header, footer, start, end) for start, end in ranges]
+    try:
+        with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+            partials = list(executor.map(_parse_graphml_chunk, tasks))
+    except ET.ParseError as e:
+        # 境界探しはバイト列の正規表現なので、コメントや CDATA 内の "<node" で切ってしまうことがある。
+        # その場合は分割をあきらめて 1 プロセスで読み直す。
+        log(f"Parallel parse failed ({e}); falling back to single-process parse")
+        return _parse_graphml_stream(graphml_path)
+
+    # チャンク順に連結するので、行の並びは 1 プロセスで読んだときと同じになる
+    merged = partials[0]
+    for part in partials[1:]:
+        for name, values in part.items():
+            if isinstance(values, list):
+                merged[name].extend(values)
+        merged["n_nodes"] += part["n_nodes"]
+    return _records_to_frames(merged)
+
+
+# ==== GraphML → 日付×国×リスク種別の集計 ====
+
+
+def graphml_to_daily_counts(graphml_path: str, workers: int | None = None) -> pd.DataFrame:
+    """
+    GraphML を読み込み、以下の列を持つ DataFrame を返す:
+      - date: datetime64[ns]
+      - country_code: str
+      - risk_type: str
+      - count: int
+
+    workers に 2 以上を渡すと、大きなファイル（PARALLEL_MIN_BYTES 以上）は
+    その数のプロセスで並列にパースする。
+    """
+    log(f"Loading GraphML: {graphml_path}")
+    if workers and workers > 1 and os.path.getsize(graphml_path) >= PARALLEL_MIN_BYTES:
+        events, locations, themes, edges = _parse_graphml_parallel(graphml_path, workers)
+    else:
+        events, locations, themes, edges = _parse_graphml_stream(graphml_path)
+
+    # 日付が読めない Event は除外（ユニークな日付文字列ごとに 1 回だけパース）。
+    # 集計中は yyyymmdd の int をキーにし、datetime への変換は最後に 1 回だけ行う。
+    date_ints: dict[str, int] = {}
+    for date_str in pd.unique(events["date"].dropna()):
+        try:
+            d = datetime.strptime(str(date_str), "%Y%m%d")
+        except ValueError:
             continue
+        date_ints[date_str] = d.year * 10000 + d.month * 100 + d.day
+    events = events.assign(date_int=events["date"].map(date_ints))
+    events = events.dropna(subset=["date_int"])
+    events = events.assign(date_int=events["date_int"].astype(np.int64))
+
+    # Event から出ている辺だけを使い、近傍の Location / Theme を引く
+    event_edges = edges[edges["src"].isin(events["id"])]
+    event_countries = (
+        event_edges.merge(locations, left_on="dst", right_on="id")[["src", "country"]]
+        .drop_duplicates()
+    )
+    # Theme はラベルごとにルール番号を出し、Event ごとには最小値（最優先のルール）を取る
+    themes = themes.assign(rule=theme_label_rules(themes["label"]))
+    event_theme_rules = (
+        event_edges.merge(themes, left_on="dst", right_on="id")
+        .groupby("src")["rule"]
+        .min()
+    )
 
-        risk_type = classify_event_risk(
-            cameo=str(cameo) if cameo is not None else None,
-            theme_labels=theme_labels,
+    # 位置情報が取れない Event は今回は無視
+    events = events[events["id"].isin(event_countries["src"])]
+
+    events = events.assign(
+        risk_type=classify_event_risks(
+            events["cameo"], events["id"].map(event_theme_rules)
         )
+    )
 
-        for cc in countries:
-            rows.append(
-                {
-                    "date": pd.to_datetime(event_date),
-                    "country_code": cc,
-                    "risk_type": risk_type,
-                }
-            )
+    df = event_countries.merge(
+        events[["id", "date_int", "risk_type"]], left_on="src", right_on="id"
+    ).rename(columns={"country": "country_code"})[
+        ["date_int", "country_code", "risk_type"]
+    ]
 
-    if not rows:
+    if df.empty:
         raise RuntimeError("Event-Location-Risk の行が 0 件でした。GraphML の構造を確認してください。")
 
-    df = pd.DataFrame(rows)
     log(
         f"Event rows (exploded by country & risk_type): {len(df)} "
-        f"(unique dates={df['date'].nunique()}, "
+        f"(unique dates={df['date_int'].nunique()}, "
         f"unique countries={df['country_code'].nunique()}, "
         f"unique risk_types={df['risk_type'].nunique()})"
     )
-    df_daily = (
-        df.groupby(["date", "country_code", "risk_type"])
-        .size()
-        .reset_index(name="count")
-        .sort_values(["date", "country_code", "risk_type"])
+    # (日付, 国, リスク種別) を 1 本の int64 キーに詰めて np.unique で数える。
+    # 国・リスク種別はソート済みの辞書順コードなので、キー順 = 日付→国→リスク種別の順になる。
+    cc_values, cc_codes = np.unique(
+        df["country_code"].to_numpy(dtype=object), return_inverse=True
+    )
+    risk_values, risk_codes = np.unique(
+        df["risk_type"].to_numpy(dtype=object), return_inverse=True
+    )
+    risk_bits = len(risk_values).bit_length()
+    cc_bits = len(cc_values).bit_length()
+    date_shift = cc_bits + risk_bits
+    key = (
+        (df["date_int"].to_numpy(np.int64) << date_shift)
+        | (cc_codes.astype(np.int64) << risk_bits)
+        | risk_codes.astype(np.int64)
+    )
+    uniq_keys, counts = np.unique(key, return_counts=True)
+
+    date_ints = pd.Series(uniq_keys >> date_shift)
+    df_daily = pd.DataFrame(
+        {
+            "date": pd.to_datetime(date_ints.astype(str), format="%Y%m%d"),
+            "country_code": cc_values[(uniq_keys >> risk_bits) & ((1 << cc_bits) - 1)],
+            "risk_type": risk_values[uniq_keys & ((1 << risk_bits) - 1)],
+            "count": counts.astype(np.int64),
+        }
     )
 
     log(f"Aggregated rows: {len(df_daily)}")
@@ -267,6 +648,23 @@ def graphml_to_daily_counts(graphml_path: str) -> pd.DataFrame:
 # ==== スパイク検知 ====
 
 
+def _delta_percent_and_mask(
+    today: np.ndarray,
+    baseline: np.ndarray,
+    min_delta_percent: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    増加率 (today - baseline) / baseline * 100 と、|増加率| >= min_delta_percent のマスクを返す。
+    途中結果は 1 本の配列を in-place で使い回し、Series の一時オブジェクトを作らない。
+    """
+    delta_percent = np.subtract(today, baseline)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(delta_percent, baseline, out=delta_percent)
+    np.multiply(delta_percent, 100.0, out=delta_percent)
+    keep = np.abs(delta_percent) >= min_delta_percent
+    return delta_percent, keep
+
+
 def detect_spikes(
     df_daily: pd.DataFrame,
     as_of: datetime,
@@ -278,13 +676,14 @@ def detect_spikes(
     df_daily（date, country_code, risk_type, count）から
     指定日のスパイクを検知し、スパイク行のみの DataFrame を返す。
     """
-    # date 列を日付に揃える
+    # date 列は datetime64 のまま日単位に揃える（Python の date オブジェクトにはしない）
     df_daily = df_daily.copy()
-    df_daily["date"] = pd.to_datetime(df_daily["date"]).dt.date
+    df_daily["date"] = pd.to_datetime(df_daily["date"]).dt.normalize()
+    dates = df_daily["date"].to_numpy()
 
     dates_min = df_daily["date"].min()
     dates_max = df_daily["date"].max()
-    log(f"date range: {dates_min} .. {dates_max}")
+    log(f"date range: {dates_min.date()} .. {dates_max.date()}")
 
     as_of_date = as_of.date()
     base_start = as_of_date - timedelta(days=baseline_days)
@@ -293,69 +692,62 @@ def detect_spikes(
     log(f"as_of = {as_of_date}, baseline_days = {baseline_days}")
     log(f"baseline window: {base_start} .. {base_end}")
 
-    # 当日分
-    df_today = df_daily[df_daily["date"] == as_of_date]
+    # 比較は datetime64 のスカラーと numpy 配列で行う
+    as_of_ns = np.datetime64(as_of_date, "ns")
+    base_start_ns = np.datetime64(base_start, "ns")
+    base_end_ns = np.datetime64(base_end, "ns")
 
-    # baseline 期間
-    df_base = df_daily[
-        (df_daily["date"] >= base_start) & (df_daily["date"] <= base_end)
-    ]
-
-    if df_today.empty:
+    # 当日 / baseline 期間 / それより前 を 1 列のラベルにして、groupby 1 回で集計する
+    window = np.select(
+        [
+            dates == as_of_ns,
+            (dates >= base_start_ns) & (dates <= base_end_ns),
+            dates < as_of_ns,
+        ],
+        ["today", "base", "old"],
+        default="",
+    )
+    if not (window == "today").any():
         log("No rows for as_of date. Returning empty result.")
         return pd.DataFrame()
 
-    # baseline が空の組は fallback: 「直近 baseline_days 日以内すべて」を baseline 扱いにする
-    # country_code × risk_type 単位で集計
-    # baseline_mean は fallback も含めて計算
-    # 1. 当日 & baseline を集計
-    agg_today = (
-        df_today.groupby(["country_code", "risk_type"])["count"]
-        .sum()
-        .reset_index()
-        .rename(columns={"count": "today"})
+    # country_code × risk_type × window ごとに件数の合計と行数を取る
+    windows = ["today", "base", "old"]
+    grouped = (
+        df_daily.assign(window=window)[window != ""]
+        .groupby(["country_code", "risk_type", "window"])["count"]
+        .agg(["sum", "count"])
+        .unstack("window", fill_value=0)
+        .reindex(
+            columns=pd.MultiIndex.from_product([["sum", "count"], windows]),
+            fill_value=0,
+        )
     )
 
-    agg_base = (
-        df_base.groupby(["country_code", "risk_type"])["count"]
-        .mean()
-        .reset_index()
-        .rename(columns={"count": "baseline"})
-    )
+    # 「今日あるところ」だけ残す
+    grouped = grouped[grouped[("count", "today")] > 0]
 
-    # 2. left join（「今日あるところ」は必ず残す）
-    merged = pd.merge(
-        agg_today,
-        agg_base,
-        on=["country_code", "risk_type"],
-        how="left",
-    )
+    # baseline は baseline 期間の平均。
+    # baseline が空の組は fallback: as_of より前の全期間の平均を baseline 扱いにする
+    base_n = grouped[("count", "base")]
+    old_n = grouped[("count", "old")]
+    baseline = (grouped[("sum", "base")] / base_n).where(base_n > 0)
 
-    # baseline が NaN のところは、全期間から fallback で計算
-    need_fallback = merged["baseline"].isna()
+    need_fallback = base_n == 0
     if need_fallback.any():
         log(
             f"baseline fallback needed for "
             f"{need_fallback.sum()} country_code×risk_type pairs."
         )
+        fallback = (grouped[("sum", "old")] / old_n).where(old_n > 0)
+        baseline = baseline.fillna(fallback)
 
-        df_all_before = df_daily[df_daily["date"] < as_of_date]
-        fb = (
-            df_all_before.groupby(["country_code", "risk_type"])["count"]
-            .mean()
-            .reset_index()
-            .rename(columns={"count": "baseline_fb"})
-        )
-
-        merged = pd.merge(
-            merged,
-            fb,
-            on=["country_code", "risk_type"],
-            how="left",
-        )
-
-        merged["baseline"] = merged["baseline"].fillna(merged["baseline_fb"])
-        merged.drop(columns=["baseline_fb"], inplace=True)
+    merged = pd.DataFrame(
+        {
+            "today": grouped[("sum", "today")],
+            "baseline": baseline.astype(np.float64),
+        }
+    ).reset_index()
 
     # baseline がまだ NaN の行は除外
     merged = merged.dropna(subset=["baseline"])
@@ -368,14 +760,16 @@ def detect_spikes(
         f"{len(merged)} (from {before_filter})"
     )
 
-    # 増加率を計算
-    merged["delta_percent"] = (merged["today"] - merged["baseline"]) / merged[
-        "baseline"
-    ] * 100.0
+    # 増加率を計算し、閾値でフィルタ
+    delta_percent, keep = _delta_percent_and_mask(
+        merged["today"].to_numpy(np.float64),
+        merged["baseline"].to_numpy(np.float64),
+        min_delta_rel * 100.0,
+    )
+    merged["delta_percent"] = delta_percent
 
-    # 閾値でフィルタ
     before_delta = len(merged)
-    merged = merged[merged["delta_percent"].abs() >= min_delta_rel * 100.0]
+    merged = merged[keep]
     log(
         f"rows after |delta_percent| >= {min_delta_rel*100:.1f}%: "
         f"{len(merged)} (from {before_delta})"
@@ -388,6 +782,36 @@ def detect_spikes(
     return merged.reset_index(drop=True)
 
 
+# ==== スパイク → 通知用 DataFrame ====
+
+
+def daily_counts_to_spike_df(
+    df_daily: pd.DataFrame,
+    as_of: datetime | None = None,
+    baseline_days: int = 7,
+    min_baseline_mean: float = 1.0,
+    min_delta_rel: float = 1.0,
+) -> pd.DataFrame:
+    """
+    df_daily からスパイクを検知し、gdelt_to_spike.df_to_spike_events が
+    そのまま読める列名にそろえて返す。
+      country_code → country_name, today → abs_count
+      （risk_type / baseline / delta_percent はそのまま）
+    as_of を省略したときはデータ中の最大日付を使う。
+    """
+    if as_of is None:
+        as_of = pd.to_datetime(df_daily["date"]).max().to_pydatetime()
+
+    spikes = detect_spikes(
+        df_daily=df_daily,
+        as_of=as_of,
+        baseline_days=baseline_days,
+        min_baseline_mean=min_baseline_mean,
+        min_delta_rel=min_delta_rel,
+    )
+    return spikes.rename(columns={"country_code": "country_name", "today": "abs_count"})
+
+
 # ==== CLI ====
 
 
@@ -419,6 +843,12 @@ def parse_args() -> argparse.Namespace:
         default=1.0,
         help="増加率の下限（例: 1.0 → +100%% 以上）",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="GraphML のパースに使うプロセス数（2 以上で大きなファイルを並列に読む）",
+    )
     parser.add_argument(
         "--output-csv",
         default="spikes_2025-11-24.csv",
@@ -430,7 +860,7 @@ def parse_args() -> argparse.Namespace:
 def main() -> None:
     args = parse_args()
 
-    df_daily = graphml_to_daily_counts(args.graphml_path)
+    df_daily = graphml_to_daily_counts(args.graphml_path, workers=args.workers)
 
     if args.as_of:
         as_of = datetime.strptime(args.as_of, "%Y-%m-%d")
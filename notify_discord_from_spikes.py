@@ -2,100 +2,238 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import codecs
+import collections
+import heapq
 import json
-from typing import List, Dict, Any
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
 
-import requests
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では標準 json でデコードする
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# 全 POST で使い回すセッション（Webhook への keep-alive 接続を再利用する）。
+# requests の import は起動時間の大半を占めるので、実際に送るときまで遅らせる。
+_SESSION: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _SESSION = requests.Session()
+        _SESSION.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        )
+        _SESSION.headers["Content-Type"] = "application/json"
+        atexit.register(_SESSION.close)
+    return _SESSION
+
+
+# 先頭の BOM → エンコーディング（utf-16 は BOM からエンディアンを判定してくれる）
+_BOM_ENCODINGS = [
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+]
+
+# バイナリモードで読んでそのまま orjson に渡せるエンコーディング
+_BYTES_ENCODINGS = frozenset({"utf-8", "utf-8-sig"})
+
+# BOM が無いときに順に試すエンコーディング（どれも駄目なら latin-1）
+_FALLBACK_ENCODINGS = ["utf-8", "cp932"]
+
+# charset_normalizer で推定するときに読む先頭バイト数と、採用する chaos（乱れ度）の上限
+_SNIFF_BYTES = 4096
+_SNIFF_MAX_CHAOS = 0.1
+
+
+def _decodes_as(path: str, encoding: str, chunk_size: int = 1 << 16) -> bool:
+    """ファイル全体が encoding でデコードできるか（チャンク単位で確認し、全体は保持しない）"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _guess_encoding(head: bytes) -> str | None:
+    """
+    先頭バイト列から charset_normalizer でエンコーディングを推定する。
+    ライブラリが無い・自信が無いときは None。
+    1 バイト系のコードページはどんなバイト列でもデコードできてしまい、
+    cp932 のファイルを誤判定しやすいので、マルチバイト系の推定だけを採用する。
+    """
+    try:
+        from charset_normalizer import from_bytes
+        from charset_normalizer.utils import is_multi_byte_encoding
+    except ImportError:  # 無ければ従来どおり固定の候補を順に試す
+        return None
+
+    # 途中で切れたマルチバイト文字で判定がぶれないよう、最後の改行までに揃える
+    cut = head.rfind(b"\n")
+    if cut > 0:
+        head = head[: cut + 1]
+    best = from_bytes(head).best()
+    if best is None or best.chaos > _SNIFF_MAX_CHAOS:
+        return None
+    if not is_multi_byte_encoding(best.encoding):
+        return None
+    return best.encoding
+
+
+def detect_encoding(path: str) -> str:
+    """
+    JSONL のエンコーディングを 1 回だけ判定する。
+    - BOM があればそれに従う
+    - BOM 無しの UTF-16 は、JSON 先頭の ASCII 文字に付く NUL バイトの位置で判定
+    - utf-8 → cp932 の順に厳密デコードできるか確認する
+    - どちらも駄目なら先頭 4KB を charset_normalizer で推定し（マルチバイト系のみ）、
+      全体をデコードできればそれを使う
+    - それでも決まらなければ latin-1
+    """
+    with open(path, "rb") as f:
+        head = f.read(_SNIFF_BYTES)
+    for bom, enc in _BOM_ENCODINGS:
+        if head.startswith(bom):
+            return enc
+    if len(head) >= 2:
+        if head[0] != 0 and head[1] == 0:
+            return "utf-16-le"
+        if head[0] == 0 and head[1] != 0:
+            return "utf-16-be"
+    if _decodes_as(path, "utf-8"):
+        return "utf-8"
+
+    for enc in _FALLBACK_ENCODINGS[1:]:
+        if _decodes_as(path, enc):
+            return enc
+    # cp932 でも読めないときだけ推定に頼る（cp949 などの誤推定でも全体をデコードできてしまい、
+    # cp932 の日本語を化けさせることがあるため、cp932 より先には試さない）
+    guessed = _guess_encoding(head)
+    if guessed is not None and guessed not in _FALLBACK_ENCODINGS:
+        if _decodes_as(path, guessed):
+            return guessed
+    return "latin-1"
+
+
+def iter_spikes(jsonl_path: str) -> Iterator[dict]:
+    """
+    JSONL を 1 行ずつ読み、SpikeEvent(dict) を順に yield する。
+    - 文字コードは detect_encoding で最初に 1 回だけ決める
+    - 各行ごとに JSON デコードを試し（orjson があればそちらを使う）、失敗した行はスキップ
+    - UTF-8 のファイルは orjson があれば str にデコードせず、バイト列のまま渡す
+    """
+    enc = detect_encoding(jsonl_path)
+    n_loaded = 0
+    n_skipped = 0
+
+    if enc in _BYTES_ENCODINGS and orjson is not None:
+        # orjson は UTF-8 のバイト列を直接受け取れる（標準 json.loads に bytes を渡すと
+        # 毎回エンコーディング判定とデコードが走って str より遅いので、その場合は text モード）
+        f = open(jsonl_path, "rb")
+        bom = codecs.BOM_UTF8
+    else:
+        f = open(jsonl_path, "r", encoding=enc)
+        bom = "\ufeff"
+
+    with f:
+        for lineno, line in enumerate(f, start=1):
+            raw = line.strip()
+            if not raw:
+                continue
+            # 先頭の BOM を落とす
+            raw = raw.lstrip(bom)
+            try:
+                obj = _json_loads(raw)
+            except json.JSONDecodeError as e:
+                # 壊れた行ごとに stdout へ書くと大きなファイルで遅くなるので、
+                # 詳細は DEBUG ログに回して件数だけ数える
+                n_skipped += 1
+                logger.debug("skip line %d (%s): %s", lineno, enc, e)
+                continue
+            n_loaded += 1
+            yield obj
+
+    if n_skipped:
+        print(f"[load_spikes] encoding {enc} で {n_loaded} 件ロード（{n_skipped} 行スキップ）")
+    else:
+        print(f"[load_spikes] encoding {enc} で {n_loaded} 件ロード")
 
 
 def load_spikes(jsonl_path: str) -> list[dict]:
     """
-    JSONL を読み込んで SpikeEvent の list を返す。
-    - 複数の文字コードを順番に試す
-    - 各行ごとに json.loads を試し、失敗した行はスキップ
+    JSONL を読み込んで SpikeEvent の list を返す（iter_spikes の全件版）。
     """
-    encodings = [
-        "utf-8",
-        "utf-8-sig",
-        "utf-16",
-        "utf-16-le",
-        "utf-16-be",
-        "cp932",
-        "shift_jis",
-        "latin-1",
-    ]
-    last_error: Exception | None = None
-
-    for enc in encodings:
-        events: list[dict] = []
-        try:
-            print(f"[load_spikes] try encoding = {enc}")
-            with open(jsonl_path, "r", encoding=enc) as f:
-                for lineno, line in enumerate(f, start=1):
-                    raw = line.strip()
-                    if not raw:
-                        continue
-                    # 先頭の BOM を落とす
-                    raw = raw.lstrip("\ufeff")
-                    try:
-                        obj = json.loads(raw)
-                    except json.JSONDecodeError as e:
-                        print(f"[load_spikes] skip line {lineno} ({enc}): {e}")
-                        continue
-                    events.append(obj)
-
-            if events:
-                print(f"[load_spikes] encoding {enc} で {len(events)} 件ロード")
-                return events
-            else:
-                last_error = RuntimeError(f"encoding {enc} では有効な JSON 行が 0 件")
-        except Exception as e:
-            last_error = e
-            continue
-
-    raise RuntimeError(f"JSONL を開けませんでした。最終エラー: {last_error}")
+    return list(iter_spikes(jsonl_path))
+
+
+# severity → (レベル表示用の絵文字, 見出し用の絵文字)
+_SEVERITY_STYLE = {
+    "EXTREME": ("🟥", "🔥"),
+    "HIGH": ("🟧", "🔥"),
+    "MEDIUM": ("🟨", "⚠️"),
+    "LOW": ("🟩", "⚠️"),
+}
+_DEFAULT_SEVERITY_STYLE = ("🟩", "⚠️")
+
+_TEMPLATE = (
+    "{header} 地政学リスク急増検知 {header}\n"
+    "レベル: {emoji} **{severity}**\n"
+    "日付: **{date}**\n"
+    "国: **{country_code}**\n"
+    "リスク種別: **{risk_type}**\n"
+    "\n"
+    "・今日の報道量: **{today} 件**\n"
+    "・平常時平均: **{baseline} 件**\n"
+    "・異常度: **{delta:.1f}% 増加**"
+)
+
 
 def format_discord_message(ev: Dict[str, Any]) -> str:
     """
     SpikeEvent → Discord メッセージ文字列
     （gdelt_spike_to_events.py の出力スキーマに合わせている）
     """
-    date = ev.get("date")
-    country_code = ev.get("country_code", "??")
-    risk_type = ev.get("risk_type", "ALL")
-    today = ev.get("today_count")
-    baseline = ev.get("baseline_mean")
-    delta = ev.get("delta_percent")
     severity = ev.get("severity", "LOW")
-
+    # delta_percent が欠けている / null のイベントでも落ちないようにする
+    delta = ev.get("delta_percent") or 0.0
     # severity に応じてちょっと表現を変える
-    severity_emoji = {
-        "EXTREME": "🟥",
-        "HIGH": "🟧",
-        "MEDIUM": "🟨",
-        "LOW": "🟩",
-    }.get(severity, "🟩")
-
-    header_emoji = "🔥" if severity in ("HIGH", "EXTREME") else "⚠️"
+    emoji, header = _SEVERITY_STYLE.get(severity, _DEFAULT_SEVERITY_STYLE)
 
-    lines = []
-    lines.append(f"{header_emoji} 地政学リスク急増検知 {header_emoji}")
-    lines.append(f"レベル: {severity_emoji} **{severity}**")
-    lines.append(f"日付: **{date}**")
-    lines.append(f"国: **{country_code}**")
-    lines.append(f"リスク種別: **{risk_type}**")
-    lines.append("")
-    lines.append(f"・今日の報道量: **{today} 件**")
-    lines.append(f"・平常時平均: **{baseline} 件**")
-    lines.append(f"・異常度: **{round(delta, 1)}% 増加**")
-
-    return "\n".join(lines)
+    return _TEMPLATE.format_map({
+        "header": header,
+        "emoji": emoji,
+        "severity": severity,
+        "date": ev.get("date"),
+        "country_code": ev.get("country_code", "??"),
+        "risk_type": ev.get("risk_type", "ALL"),
+        "today": ev.get("today_count"),
+        "baseline": ev.get("baseline_mean"),
+        "delta": delta,
+    })
 
 
 def send_to_discord(webhook_url: str, content: str) -> None:
     """Discord にメッセージを投げる"""
     payload = {"content": content}
-    r = requests.post(webhook_url, json=payload)
+    r = _get_session().post(webhook_url, json=payload)
     try:
         r.raise_for_status()
     except Exception as e:
@@ -116,21 +254,50 @@ def main() -> None:
         default=10,
         help="一度に通知する最大件数（デフォルト: 10）",
     )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.0,
+        help="delta_percent がこの値未満のイベントは通知対象にしない（デフォルト: 0.0）",
+    )
     args = parser.parse_args()
 
-    spikes = load_spikes(args.jsonl_path)
+    # 全件をリストに溜めてソートせず、ストリームから上位 max_events 件だけを保持する
+    # （min_delta 未満のものは top-k の候補に入れる前に捨てる）
+    n_spikes = 0
+    n_candidates = 0
 
-    if not spikes:
+    def candidate_spikes() -> Iterator[tuple]:
+        nonlocal n_spikes, n_candidates
+        for ev in iter_spikes(args.jsonl_path):
+            n_spikes += 1
+            # format_discord_message と同じく、欠けている / null の delta_percent は 0.0 扱い
+            delta = float(ev.get("delta_percent") or 0.0)
+            if delta < args.min_delta:
+                continue
+            n_candidates += 1
+            yield delta, ev
+
+    # 念のため delta_percent の降順に
+    candidates = candidate_spikes()
+    to_send = [
+        ev
+        for _, ev in heapq.nlargest(args.max_events, candidates, key=lambda x: x[0])
+    ]
+    # max_events <= 0 だと nlargest はジェネレータを読まずに返すので、
+    # 件数のログが合うように残りを読み切っておく（それ以外では既に空）
+    collections.deque(candidates, maxlen=0)
+
+    if n_spikes == 0:
         print("[notify] SpikeEvent は 0 件でした。通知しません。")
         return
 
-    # 念のため delta_percent の降順に
-    spikes_sorted = sorted(
-        spikes, key=lambda x: float(x.get("delta_percent", 0.0)), reverse=True
-    )
+    if n_candidates < n_spikes:
+        print(
+            f"[notify] delta_percent < {args.min_delta} の {n_spikes - n_candidates} 件を除外しました。"
+        )
 
-    to_send = spikes_sorted[: args.max_events]
-    print(f"[notify] {len(spikes)} 件中 {len(to_send)} 件を Discord に通知します。")
+    print(f"[notify] {n_spikes} 件中 {len(to_send)} 件を Discord に通知します。")
 
     for ev in to_send:
         msg = format_discord_message(ev)
@@ -3,25 +3,27 @@
 from datetime import datetime
 import os
 
-from graphml_to_spikes import graphml_to_daily_counts_from_events, daily_counts_to_spike_df
-from gdelt_to_spike import df_to_spike_events   # 前に作ったやつ
-from send_discord import send_spike_events_batch       # 前に作ったやつ
+from graphml_to_spikes import graphml_to_daily_counts, daily_counts_to_spike_df
+from send_discord import send_spike_events_from_df    # 前に作ったやつ
 
 
-GRAPHML_PATH = "gdelt_full_kg.graphml"
+GRAPHML_PATH = os.environ.get("GRAPHML_PATH", "gdelt_full_kg.graphml")
 WEBHOOK_URL = os.environ["DISCORD_WEBHOOK_URL"]
+# DISCORD_DRY_RUN=1 なら送信せず payload を標準出力に出すだけ
+DRY_RUN = os.environ.get("DISCORD_DRY_RUN") == "1"
 
 
 def main():
-    df_daily = graphml_to_daily_counts_from_events(GRAPHML_PATH)
+    # XML のパースが一番重いので、コア数ぶんのプロセスで並列に読む
+    df_daily = graphml_to_daily_counts(GRAPHML_PATH, workers=os.cpu_count())
     df_spikes = daily_counts_to_spike_df(df_daily)
 
     if df_spikes.empty:
         print("[run_daily] No spike detected.")
         return
 
-    events = df_to_spike_events(df_spikes)
-    send_spike_events_batch(events, WEBHOOK_URL, max_events=3, dry_run=False)
+    # ΔR 上位 3 件だけ SpikeEvent にして送る
+    send_spike_events_from_df(df_spikes, WEBHOOK_URL, max_events=3, dry_run=DRY_RUN)
 
 
 if __name__ == "__main__":
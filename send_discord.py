@@ -2,13 +2,28 @@
 
 from __future__ import annotations
 
+import atexit
+import http.client
+import itertools
+import json
 import os
+import threading
 import time
-from typing import Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
+from build_message import SpikeEvent, build_combined_payloads, build_discord_payload
 
-from build_message import SpikeEvent, build_discord_payload
+if TYPE_CHECKING:
+    import httpx
+    import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では標準 json でエンコードする
+    orjson = None
 
 
 class DiscordSenderError(Exception):
@@ -17,6 +32,195 @@ class DiscordSenderError(Exception):
     pass
 
 
+# 全 POST で使い回す keep-alive 接続（discord.com への TCP/TLS 接続を再利用し、
+# 1 件ごとのハンドシェイクを避ける）。http.client の接続はスレッドセーフではないので
+# スレッドごと・ホストごとに 1 本持つ。
+_LOCAL = threading.local()
+_ALL_CONNS: List[http.client.HTTPConnection] = []
+_ALL_CONNS_LOCK = threading.Lock()
+
+# 相手に切られていた keep-alive 接続を使ったときに出る例外
+_STALE_CONN_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def _close_all_connections() -> None:
+    with _ALL_CONNS_LOCK:
+        for conn in _ALL_CONNS:
+            conn.close()
+        _ALL_CONNS.clear()
+
+
+atexit.register(_close_all_connections)
+
+
+def _get_connection(scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+    """このスレッド用の (scheme, netloc) への接続を返す。無ければ作る。"""
+    conns = getattr(_LOCAL, "conns", None)
+    if conns is None:
+        conns = _LOCAL.conns = {}
+    key = (scheme, netloc)
+    conn = conns.get(key)
+    if conn is None:
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conns[key] = cls(netloc, timeout=timeout)
+        with _ALL_CONNS_LOCK:
+            _ALL_CONNS.append(conn)
+    else:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+    return conn
+
+
+def _post_http1(url: str, body: bytes, timeout: float) -> Tuple[int, Mapping[str, str], str]:
+    """
+    http.client で url に JSON の body を POST し、(status, headers, 本文テキスト) を返す。
+    使い回した接続が切れていた場合だけ、1 回だけ張り直して送り直す。
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+    }
+    conn = _get_connection(parts.scheme, parts.netloc, timeout)
+
+    for reconnect in (True, False):
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+            # 次のリクエストで接続を再利用できるよう、本文は必ず読み切る
+            text = resp.read().decode("utf-8", errors="replace")
+            return resp.status, resp.headers, text
+        except _STALE_CONN_ERRORS:
+            conn.close()
+            if not reconnect:
+                raise
+        except Exception:
+            # タイムアウト等で中途半端な状態になった接続は捨てる（次回自動で張り直す）
+            conn.close()
+            raise
+    raise AssertionError("unreachable")
+
+
+# httpx と h2 が入っていれば https の Webhook は HTTP/2 で送る。
+# クライアントはスレッドセーフなので全スレッドで 1 つを共有し、
+# 並列送信も 1 本の TCP/TLS 接続上で多重化される。
+HTTP2_AVAILABLE = find_spec("httpx") is not None and find_spec("h2") is not None
+_HTTP2_CLIENT: Optional[httpx.Client] = None
+_HTTP2_CLIENT_LOCK = threading.Lock()
+
+
+def _get_http2_client() -> httpx.Client:
+    global _HTTP2_CLIENT
+    with _HTTP2_CLIENT_LOCK:
+        if _HTTP2_CLIENT is None:
+            # import が重いので、実際に送るときまで遅らせる
+            import httpx
+
+            _HTTP2_CLIENT = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+            )
+            atexit.register(_HTTP2_CLIENT.close)
+    return _HTTP2_CLIENT
+
+
+def _post(url: str, body: bytes, timeout: float) -> Tuple[int, Mapping[str, str], str]:
+    """
+    url に JSON の body を POST し、(status, headers, 本文テキスト) を返す。
+    https かつ httpx[http2] があれば HTTP/2、それ以外は http.client の keep-alive 接続を使う。
+    """
+    if HTTP2_AVAILABLE and url.startswith("https://"):
+        resp = _get_http2_client().post(
+            url,
+            content=body,
+            headers={"Content-Type": "application/json"},
+            timeout=timeout,
+        )
+        return resp.status_code, resp.headers, resp.text
+    return _post_http1(url, body, timeout)
+
+
+# Discord Webhook のレート制限（おおよそ 2 秒あたり 5 リクエスト）に合わせた既定値
+DEFAULT_RATE_PER_SEC = 2.5
+DEFAULT_BURST = 5
+
+
+class TokenBucket:
+    """
+    送信前に 1 トークンずつ消費するトークンバケット（スレッドセーフ）。
+    429 を受けてから待つのではなく、上限を超えないように先回りして待つ。
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        # サーバ側のレート制限ヘッダで指示された「次に送ってよい時刻」
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """トークンを 1 つ取る。足りなければ補充されるまで sleep する。"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last) * self.rate
+            )
+            self.last = now
+            # 先に消費してしまい、マイナス分（=借り）を待ち時間に換算する
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            wait = max(wait, self.blocked_until - now)
+        if wait > 0:
+            time.sleep(wait)
+
+    def block_until(self, deadline: float) -> None:
+        """deadline（time.monotonic 基準）までは acquire しても待たせる。"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, deadline)
+
+
+# Webhook（ホスト + パス）ごとのバケット
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def _bucket_for(webhook_url: str) -> TokenBucket:
+    parts = urlsplit(webhook_url)
+    key = parts.netloc + parts.path
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            bucket = _BUCKETS[key] = TokenBucket(DEFAULT_RATE_PER_SEC, DEFAULT_BURST)
+    return bucket
+
+
+def _apply_rate_limit_headers(bucket: TokenBucket, headers: Mapping[str, str]) -> None:
+    """
+    成功レスポンスの X-RateLimit-* を見て、この Webhook の残り回数が 0 なら
+    リセットまで次の送信を止めておく（429 を受けてから待つのではなく先回りする）。
+    """
+    if headers.get("X-RateLimit-Remaining") != "0":
+        return
+    try:
+        reset_after = float(headers.get("X-RateLimit-Reset-After"))
+    except (TypeError, ValueError):
+        return
+    bucket.block_until(time.monotonic() + reset_after)
+
+
+def _encode_payload(payload: dict) -> bytes:
+    """payload を JSON のバイト列にする（orjson があればそちらを使う）"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
 def send_discord_payload(
     webhook_url: str,
     payload: dict,
@@ -36,16 +240,21 @@ def send_discord_payload(
     :param retry_backoff_sec: リトライごとの待機秒 (指数バックオフベース)
     """
     last_err: Optional[Exception] = None
+    bucket = _bucket_for(webhook_url)
+    # リトライのたびに再エンコードしないよう、本文は最初に 1 回だけ作る
+    body = _encode_payload(payload)
 
     for attempt in range(1, max_retries + 1):
         try:
-            resp = requests.post(webhook_url, json=payload, timeout=timeout)
-            if resp.status_code == 204:
+            bucket.acquire()
+            status, headers, text = _post(webhook_url, body, timeout)
+            if status == 204:
                 # Discord Webhookは成功時 204 No Content を返す
+                _apply_rate_limit_headers(bucket, headers)
                 return
             # レートリミット対応 (429)
-            if resp.status_code == 429:
-                retry_after = resp.headers.get("Retry-After")
+            if status == 429:
+                retry_after = headers.get("Retry-After")
                 if retry_after is not None:
                     try:
                         sleep_sec = float(retry_after)
@@ -54,15 +263,21 @@ def send_discord_payload(
                 else:
                     sleep_sec = retry_backoff_sec * attempt
 
+                # 最後の試行なら待っても送り直さないので、すぐに諦める
+                if attempt == max_retries:
+                    raise DiscordSenderError(
+                        f"Discord webhook rate limited (429) after {max_retries} attempts: {text}"
+                    )
+
                 print(f"[Discord] Rate limited. sleep {sleep_sec:.1f}s")
                 time.sleep(sleep_sec)
                 continue
 
             # その他のエラー
             raise DiscordSenderError(
-                f"Discord webhook error: {resp.status_code} {resp.text}"
+                f"Discord webhook error: {status} {text}"
             )
-        except Exception as e:  # requests 例外もまとめて扱う
+        except Exception as e:  # 通信エラー (OSError / http.client 例外) もまとめて扱う
             last_err = e
             if attempt == max_retries:
                 break
@@ -91,8 +306,6 @@ def send_spike_event(
     payload = build_discord_payload(event)
 
     if dry_run:
-        import json
-
         print("[Discord dry-run] payload:")
         print(json.dumps(payload, ensure_ascii=False, indent=2))
         return
@@ -111,35 +324,112 @@ def send_spike_events_batch(
     """
     SpikeEvent のリストをまとめて送信する。
     ・上位 max_events 件だけ送る（スパム防止）
+    ・複数件を 1 メッセージの embeds にまとめ、なるべく 1 回の POST で送る
+      （Discord の上限 10 embed / 6000 文字を超える分は次のメッセージに回す）
     ・送信に成功したものをリストで返す
 
     :param events: SpikeEvent iterable
     :param webhook_url: Discord Webhook URL
     :param max_events: 1回の実行で送信する最大件数
     :param dry_run: True のときは送信せず payload を標準出力
-    :param sleep_between_sec: 複数送るときのインターバル秒
+    :param sleep_between_sec: メッセージが複数に分かれたときのインターバル秒
     :return: 送信したイベントのリスト
     """
-    sent: List[SpikeEvent] = []
-    for i, ev in enumerate(events):
-        if i >= max_events:
-            print(f"[Discord] Max events ({max_events}) reached. Skipping remaining.")
-            break
+    # 1 件多く読んで、打ち切りが発生したかどうかだけ判定する
+    to_send = list(itertools.islice(events, max_events + 1))
+    if len(to_send) > max_events:
+        print(f"[Discord] Max events ({max_events}) reached. Skipping remaining.")
+        del to_send[max_events:]
 
+    for i, ev in enumerate(to_send):
         print(
             f"[Discord] Sending event {i+1}/{max_events}: "
             f"{ev.country_name} {ev.risk_type} ΔR={ev.delta_percent:.0f}%"
         )
 
-        send_spike_event(ev, webhook_url, dry_run=dry_run)
-        sent.append(ev)
-
-        if not dry_run and sleep_between_sec > 0 and i < max_events - 1:
+    sent: List[SpikeEvent] = []
+    chunks = build_combined_payloads(to_send)
+    for i, (chunk_events, payload) in enumerate(chunks):
+        if dry_run:
+            print("[Discord dry-run] payload:")
+            print(json.dumps(payload, ensure_ascii=False, indent=2))
+        else:
+            send_discord_payload(webhook_url, payload)
+        sent.extend(chunk_events)
+
+        if not dry_run and sleep_between_sec > 0 and i < len(chunks) - 1:
             time.sleep(sleep_between_sec)
 
     return sent
 
 
+def send_spike_events_from_df(
+    df_spikes: pd.DataFrame,
+    webhook_url: str,
+    *,
+    max_events: int = 5,
+    dry_run: bool = False,
+) -> List[SpikeEvent]:
+    """
+    スパイクの DataFrame から ΔR の大きい順に max_events 件だけ選んで送信する。
+    送らない行まで SpikeEvent にしないよう、先に nlargest で絞ってから
+    df_to_spike_events に渡す。
+
+    :param df_spikes: df_to_spike_events が想定するカラムを持つ DataFrame
+    :param webhook_url: Discord Webhook URL
+    :param max_events: 1回の実行で送信する最大件数
+    :param dry_run: True のときは送信せず payload を標準出力
+    :return: 送信したイベントのリスト
+    """
+    from gdelt_to_spike import df_to_spike_events
+
+    top = df_spikes.nlargest(max_events, "delta_percent")
+    events = df_to_spike_events(top)
+    return send_spike_events_batch(
+        events, webhook_url, max_events=max_events, dry_run=dry_run
+    )
+
+
+def send_spike_events_concurrent(
+    events: Iterable[SpikeEvent],
+    webhook_url: str,
+    *,
+    max_events: int = 5,
+    concurrency: int = 4,
+    dry_run: bool = False,
+) -> List[SpikeEvent]:
+    """
+    send_spike_events_batch の並列版。
+    上位 max_events 件を最大 concurrency 本のスレッドで同時に POST するので、
+    全体の待ち時間は N 往復ではなくおおよそ ceil(N / concurrency) 往復分になる。
+    どれか 1 件でも送信に失敗したら DiscordSenderError を送出する。
+
+    :param events: SpikeEvent iterable
+    :param webhook_url: Discord Webhook URL
+    :param max_events: 1回の実行で送信する最大件数
+    :param concurrency: 同時に送信する最大件数（HTTP/1.1 ではスレッドごとに接続を 1 本、HTTP/2 では 1 本を多重化）
+    :param dry_run: True のときは送信せず payload を標準出力（逐次）
+    :return: 送信したイベントのリスト
+    """
+    to_send = list(itertools.islice(events, max_events))
+    for i, ev in enumerate(to_send):
+        print(
+            f"[Discord] Sending event {i+1}/{len(to_send)}: "
+            f"{ev.country_name} {ev.risk_type} ΔR={ev.delta_percent:.0f}%"
+        )
+
+    if dry_run or concurrency <= 1:
+        for ev in to_send:
+            send_spike_event(ev, webhook_url, dry_run=dry_run)
+        return to_send
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # list() で全件の完了を待ち、失敗があればここで例外が上がる
+        list(executor.map(lambda ev: send_spike_event(ev, webhook_url), to_send))
+
+    return to_send
+
+
 # ちょっとした手動テスト用
 if __name__ == "__main__":
     from build_message import SimilarCase, Article
@@ -0,0 +1,105 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import graphml_to_spikes  # noqa: E402
+from graphml_to_spikes import graphml_to_daily_counts  # noqa: E402
+
+_COUNTRIES = ["JP", "TW", "US", "CN"]
+_THEMES = ["TAX_MILITARY", "PROTEST", "ELECTION", "ECON_TRADE", "ENV_FLOOD", "SOFTWARE"]
+_CAMEOS = ["190", "145", "", "051", "036"]
+
+
+def _write_graphml(path: Path, *, n_events: int = 400, with_comments: bool = False) -> None:
+    """日付 8 日分・国 4 つ・テーマ 6 つの Event グラフを書き出す（乱数は使わず決定的に作る）"""
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">',
+        '<key id="t" for="node" attr.name="type" attr.type="string"/>',
+        '<key id="l" for="node" attr.name="label" attr.type="string"/>',
+        '<key id="d" for="node" attr.name="date" attr.type="string"/>',
+        '<key id="c" for="node" attr.name="country" attr.type="string"/>',
+        '<key id="m" for="node" attr.name="cameo" attr.type="string"/>',
+        '<graph edgedefault="undirected">',
+    ]
+    for i, cc in enumerate(_COUNTRIES):
+        lines.append(f'<node id="loc{i}"><data key="t">Location</data><data key="c">{cc}</data></node>')
+    for i, label in enumerate(_THEMES):
+        lines.append(f'<node id="th{i}"><data key="t">Theme</data><data key="l">{label}</data></node>')
+    for e in range(n_events):
+        day = 17 + e % 8
+        cameo = _CAMEOS[e % len(_CAMEOS)]
+        cameo_data = f'<data key="m">{cameo}</data>' if cameo else ""
+        lines.append(
+            f'<node id="e{e}"><data key="t">Event</data>'
+            f'<data key="d">202511{day}</data>{cameo_data}</node>'
+        )
+        lines.append(f'<edge source="e{e}" target="loc{e % len(_COUNTRIES)}"/>')
+        if e % 3:
+            lines.append(f'<edge source="e{e}" target="th{e % len(_THEMES)}"/>')
+        if with_comments and e % 4 == 0:
+            # コメント内の "<node" / "<edge" は要素の境界ではない
+            dropped = " ".join(f'<node id="x{e}_{k}"> <edge source="x{e}_{k}" target="loc0"/>' for k in range(20))
+            lines.append(f"<!-- dropped: {dropped} -->")
+    lines += ["</graph>", "</graphml>"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@pytest.mark.parametrize("with_comments", [False, True])
+@pytest.mark.parametrize("workers", [2, 4, 7])
+def test_parallel_parse_matches_single_process(tmp_path, monkeypatch, workers, with_comments):
+    path = tmp_path / "graph.graphml"
+    _write_graphml(path, with_comments=with_comments)
+    monkeypatch.setattr(graphml_to_spikes, "PARALLEL_MIN_BYTES", 0)
+
+    expected = graphml_to_daily_counts(str(path), workers=1)
+    actual = graphml_to_daily_counts(str(path), workers=workers)
+
+    assert not expected.empty
+    assert actual.equals(expected)
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def _rows(df):
+    return [
+        (str(r.date.date()), r.country_code, r.risk_type, r.count)
+        for r in df.itertuples(index=False)
+    ]
+
+
+def test_daily_counts_undirected_fixture():
+    # 逆向きに書かれた辺も辿る / ラベル無し Theme に <key> の default は使わない /
+    # 国コードの無い Location と日付が読めない Event は数えない
+    df = graphml_to_daily_counts(str(FIXTURES / "small_kg_undirected.graphml"))
+
+    assert list(df.columns) == ["date", "country_code", "risk_type", "count"]
+    assert pd.api.types.is_datetime64_dtype(df["date"])
+    assert _rows(df) == [
+        ("2025-11-23", "JP", "MILITARY", 1),
+        ("2025-11-24", "JP", "CIVIL_UNREST", 1),
+        ("2025-11-24", "JP", "MILITARY", 1),
+        ("2025-11-24", "JP", "OTHER", 1),
+        ("2025-11-24", "TW", "CIVIL_UNREST", 1),
+        ("2025-11-24", "TW", "MILITARY", 1),
+        ("2025-11-24", "TW", "NATURAL_DISASTER", 1),
+    ]
+
+
+def test_daily_counts_directed_fixture():
+    # 有向グラフでは Event から出ている辺だけを辿る（Location→Event / Theme→Event は無視）
+    df = graphml_to_daily_counts(str(FIXTURES / "small_kg_directed.graphml"))
+
+    assert _rows(df) == [
+        ("2025-11-23", "JP", "MILITARY", 1),
+        ("2025-11-24", "JP", "CIVIL_UNREST", 1),
+        ("2025-11-24", "JP", "OTHER", 2),
+        ("2025-11-24", "TW", "CIVIL_UNREST", 1),
+        ("2025-11-24", "TW", "MILITARY", 1),
+    ]
@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from notify_discord_from_spikes import detect_encoding, load_spikes  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def test_cp932_kanji_only_jsonl_is_not_misdetected():
+    # 漢字だけの短い cp932 ファイルは charset_normalizer が cp949 と誤推定することがある
+    path = str(FIXTURES / "spikes_cp932_kanji.jsonl")
+
+    assert detect_encoding(path) == "cp932"
+
+    events = load_spikes(path)
+    assert [(ev["country_code"], ev["risk_type"]) for ev in events] == [
+        ("台湾", "軍事"),
+        ("露国", "災害"),
+        ("印度", "経済"),
+    ]